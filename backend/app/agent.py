@@ -6,18 +6,29 @@ Ollama (local) and OpenAI models.
 """
 
 import os
+import re
+import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import functools
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Tuple, Sequence, AsyncIterator
 from pathlib import Path
 
+import httpx
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from langchain.embeddings import OpenAIEmbeddings, HuggingFaceEmbeddings
+from langchain.embeddings.base import Embeddings
 from langchain.llms import OpenAI, Ollama
 from langchain.chat_models import ChatOpenAI, ChatOllama
-from langchain.schema import Document
+from langchain.schema import Document, BaseRetriever
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain.schema.runnable import RunnablePassthrough
+from langchain.schema.runnable import RunnableLambda
 from langchain.schema.output_parser import StrOutputParser
 from langchain.vectorstores import Chroma
 from langchain.retrievers.multi_vector import MultiVectorRetriever
@@ -25,16 +36,388 @@ try:
     from google.cloud import translate_v2 as translate
 except ImportError:
     translate = None
+try:
+    import torch
+except ImportError:
+    torch = None
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:
+    onnxruntime = None
+    Tokenizer = None
 
 logger = logging.getLogger(__name__)
 
 
+# The agent persona. Kept as a single immutable constant so every request sends a
+# byte-identical system prefix, which lets Ollama and OpenAI reuse the prefix KV cache.
+_SYSTEM_PROMPT_TEXT = """You are the VitaeAgent, a sophisticated digital professional persona that represents a specific individual's career, skills, and accomplishments. You are NOT a general assistant - you are the digital embodiment of this person's professional identity.
+
+## Core Personality Traits:
+
+**Meticulously Factual**: You never speculate or invent information. Your knowledge is strictly confined to the provided context documents. If information is not in your knowledge base, you clearly state that you don't have that information.
+
+**Proactively Helpful**: You don't just answer questions - you engage meaningfully. If a query is vague, you ask clarifying questions to guide the conversation toward more insightful exchanges.
+
+**Transparent & Trustworthy**: Every key claim you make must be backed by a citation in the format [Source: filename, Page X] or [Source: URL] or [Source: GitHub: repository-name]. This builds immediate trust with users.
+
+**Professional & Engaging**: You communicate in a professional yet personable tone, as if you are the person yourself speaking about their career journey.
+
+## Response Guidelines:
+
+1. **Source Citations**: Always cite your sources for factual claims using the format [Source: document_name] or [Source: URL]. This is critical for building trust.
+
+2. **Scope Boundaries**: Only discuss information from your knowledge base. For questions outside this scope, politely explain that you don't have that information and suggest focusing on areas where you can provide detailed insights.
+
+3. **Proactive Engagement**: When appropriate, suggest related topics or ask clarifying questions to deepen the conversation. For example: "Would you like to know more about the specific technologies used in that project?"
+
+4. **Professional Tone**: Speak as the professional would speak about themselves - confident but not boastful, detailed but not overwhelming.
+
+## Example Response Patterns:
+
+For specific achievements: "In the Project Phoenix initiative, I led a team of 5 developers to implement a cloud migration strategy that reduced infrastructure costs by 40% [Source: portfolio.pdf, Page 3]. The project involved extensive work with AWS services and DevOps practices."
+
+For skill inquiries: "My experience with Python spans over 8 years, including work on machine learning projects, web development with Django and FastAPI, and automation scripts [Source: cv.pdf, Page 1]. Would you like me to elaborate on any specific Python applications?"
+
+For unknown information: "I don't have specific information about that particular framework in my knowledge base. However, I can share details about my experience with related technologies like React and Vue.js [Source: github_projects]."
+
+Remember: You are this person's professional advocate and representative. Your goal is to provide accurate, engaging, and helpful information that showcases their capabilities and experience while maintaining complete honesty about the bounds of your knowledge."""
+
+# Stable identifier for the cached prefix, logged so cache hits can be correlated
+# across restarts and deployments.
+SYSTEM_PROMPT_CACHE_KEY = hashlib.sha256(_SYSTEM_PROMPT_TEXT.encode("utf-8")).hexdigest()[:16]
+
+_HUMAN_PROMPT_TEXT = """Based on the following context about this professional's background, please answer the user's question. Remember to cite your sources.
+
+Context:
+{context}
+
+User Question: {question}
+
+Please provide a comprehensive, well-cited response that stays within the bounds of the provided context."""
+
+# Starter questions offered to users; a static list served by /suggestions
+SUGGESTED_QUESTIONS = (
+    "What is your professional background?",
+    "Tell me about your most significant project.",
+    "What programming languages and technologies do you work with?",
+    "What are your key achievements in your career?",
+    "Describe your leadership experience.",
+    "What industries have you worked in?",
+    "Tell me about your education and certifications.",
+    "What type of challenges do you excel at solving?",
+    "Show me examples of your technical work.",
+    "What makes you unique as a professional?",
+)
+
+# Seconds a full health check result is reused by probes
+_HEALTH_CACHE_TTL = 15.0
+
+# Language codes answered directly, without a translation round trip
+_PASSTHROUGH_LANGS = frozenset({"en", "english", "en-us", "en-gb"})
+
+# HNSW settings Chroma fixes when a collection is created and refuses in modify()
+_HNSW_CREATION_ONLY_KEYS = frozenset({"hnsw:space", "hnsw:M", "hnsw:construction_ef"})
+
+# Per-source metadata table, referenced from chunks by source_id
+SOURCES_COLLECTION = "vitae_sources"
+
+# In-process cache sizes for repeated questions
+_RETRIEVAL_CACHE_SIZE = 1024
+_RESPONSE_CACHE_SIZE = 256
+
+
+# Prompt templates are parsed once at import and shared by every agent instance
+_SYSTEM_MSG = SystemMessagePromptTemplate.from_template(_SYSTEM_PROMPT_TEXT)
+_HUMAN_MSG = HumanMessagePromptTemplate.from_template(_HUMAN_PROMPT_TEXT)
+_CHAT_PROMPT = ChatPromptTemplate.from_messages([_SYSTEM_MSG, _HUMAN_MSG])
+
+
+class LocalOnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformers encoder running an int8-quantized ONNX export on
+    ONNX Runtime. Produces the same mean-pooled, L2-normalized vectors as
+    HuggingFaceEmbeddings with normalize_embeddings=True.
+    """
+    
+    def __init__(self, model_path: str, tokenizer_name: str, batch_size: int = 64, max_length: int = 256):
+        sess_options = onnxruntime.SessionOptions()
+        sess_options.intra_op_num_threads = os.cpu_count() or 1
+        sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=sess_options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.model_path = model_path
+        
+        # Prefer the tokenizer exported alongside the model, fall back to the Hub
+        tokenizer_file = Path(model_path).with_name("tokenizer.json")
+        if tokenizer_file.exists():
+            self.tokenizer = Tokenizer.from_file(str(tokenizer_file))
+        else:
+            self.tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        self.tokenizer.enable_truncation(max_length=max_length)
+        
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode one padded batch with a single session.run call."""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        
+        token_embeddings = self.session.run(None, feeds)[0]
+        
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[..., np.newaxis].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents in batches of `batch_size`."""
+        if not texts:
+            return []
+        batches = [
+            self._encode_batch(texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.vstack(batches).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self._encode_batch([text])[0].tolist()
+
+
+def _sq8_encode(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 scalar quantization, so that x ~= code * scale."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    # Row-major (doc-major, dim-minor) so each code vector is contiguous
+    codes = np.ascontiguousarray(np.round(vectors / scales[:, np.newaxis]), dtype=np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _sq8_scan(q: np.ndarray, code_matrix: np.ndarray, scales: np.ndarray, block_rows: int = 4096) -> np.ndarray:
+    """
+    Asymmetric dot products between an FP32 query and SQ8 code rows.
+    
+    Codes are widened to float32 one cache-sized block at a time, so every
+    block is a BLAS SGEMV while the corpus itself stays int8 in memory; the
+    result is rescaled by the per-row scales.
+    """
+    scores = np.empty(len(code_matrix), dtype=np.float32)
+    for start in range(0, len(code_matrix), block_rows):
+        block = code_matrix[start:start + block_rows]
+        scores[start:start + len(block)] = block.astype(np.float32) @ q
+    return scores * scales
+
+
+class SQ8Retriever(BaseRetriever):
+    """
+    In-memory retriever over SQ8 (int8 scalar-quantized) document vectors.
+    Candidates come from an asymmetric scan of the FP32 query against the int8
+    codes; the top candidates are then rescored against the FP32 vectors.
+    """
+    
+    embeddings: Any
+    documents: List[Document]
+    codes: Any
+    scales: Any
+    vectors: Any = None
+    k: int = 5
+    fetch_k: int = 20
+
+    @classmethod
+    def from_collection(cls, collection, embeddings: Embeddings, k: int = 5, fetch_k: int = 20) -> "SQ8Retriever":
+        """Snapshot a Chroma collection into SQ8 codes plus the FP32 vectors for rescoring."""
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(data["documents"], data["metadatas"])
+        ]
+        
+        if not documents:
+            return cls(embeddings=embeddings, documents=[], codes=None, scales=None, k=k, fetch_k=fetch_k)
+        
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        # Unit rows, so both the SQ8 scan and the FP32 rescore rank by cosine like the collection
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = np.ascontiguousarray(vectors / norms)
+        codes, scales = _sq8_encode(vectors)
+        
+        logger.info(f"Built SQ8 index over {len(documents)} chunks")
+        return cls(embeddings=embeddings, documents=documents, codes=codes, scales=scales,
+                   vectors=vectors, k=k, fetch_k=fetch_k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if not self.documents:
+            return []
+        
+        q = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        
+        # SQ8 scan over the whole corpus; one person's documents stay small
+        scores = _sq8_scan(q, self.codes, self.scales)
+        n = min(self.fetch_k, len(scores))
+        candidates = np.argpartition(-scores, n - 1)[:n]
+        
+        # Dual precision: rescore the shortlist with the original FP32 vectors
+        candidate_scores = self.vectors[candidates] @ q
+        
+        top = candidates[np.argsort(-candidate_scores)[:self.k]]
+        return [self.documents[i] for i in top]
+
+
+def _mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Pick k rows of `candidates` by Maximal Marginal Relevance.
+    
+    All pairwise similarities are computed up front with two matrix products;
+    each selection step is then a masked argmax over the candidate vector.
+    """
+    E = candidates / np.clip(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12, None)
+    q = query / max(float(np.linalg.norm(query)), 1e-12)
+    q_doc_sim = E @ q
+    doc_doc_sim = E @ E.T
+    
+    first = int(np.argmax(q_doc_sim))
+    selected = [first]
+    available = np.ones(len(E), dtype=bool)
+    available[first] = False
+    # Highest similarity of each candidate to anything already selected
+    max_selected_sim = doc_doc_sim[first].copy()
+    
+    while len(selected) < min(k, len(E)):
+        scores = lambda_mult * q_doc_sim - (1 - lambda_mult) * max_selected_sim
+        scores[~available] = -np.inf
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        available[idx] = False
+        np.maximum(max_selected_sim, doc_doc_sim[idx], out=max_selected_sim)
+    
+    return selected
+
+
+class MMRRetriever(BaseRetriever):
+    """
+    Maximal Marginal Relevance retriever over a Chroma collection.
+    Fetches `fetch_k` candidates together with their stored embeddings in a
+    single query, so nothing is re-embedded, then keeps `k` diverse results.
+    """
+    
+    collection: Any
+    embeddings: Any
+    k: int = 5
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        q = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        results = self.collection.query(
+            query_embeddings=[q.tolist()],
+            n_results=self.fetch_k,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        
+        texts = results["documents"][0]
+        if not texts:
+            return []
+        
+        metadatas = results["metadatas"][0]
+        candidates = np.asarray(results["embeddings"][0], dtype=np.float32)
+        selected = _mmr_select(q, candidates, self.k, self.lambda_mult)
+        return [Document(page_content=texts[i], metadata=metadatas[i] or {}) for i in selected]
+
+
+# Pooled keep-alive client for direct Ollama API calls. Created lazily so that
+# OLLAMA_BASE_URL is read after the application has loaded its .env file.
+_ollama_client: Optional[httpx.Client] = None
+_ollama_probed = False
+
+
+def _get_ollama_client() -> httpx.Client:
+    """Get or create the shared Ollama HTTP client."""
+    global _ollama_client
+    if _ollama_client is None:
+        _ollama_client = httpx.Client(
+            base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=300)
+        )
+    return _ollama_client
+
+
+def _normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups (case and whitespace insensitive)."""
+    return re.sub(r'\s+', ' ', query.strip().lower())
+
+
+def _fmt_pdf_source(metadata: Dict[str, Any]) -> str:
+    source = metadata.get('source', 'Unknown PDF')
+    page = metadata.get('page', '')
+    return f"{source}" + (f", Page {page + 1}" if page != '' else "")
+
+
+def _fmt_text_source(metadata: Dict[str, Any]) -> str:
+    return metadata.get('source', 'Unknown Text File')
+
+
+def _fmt_blog_source(metadata: Dict[str, Any]) -> str:
+    title = metadata.get('title', 'Blog Post')
+    url = metadata.get('url', '')
+    return f"{title} - {url}" if url else title
+
+
+def _fmt_github_source(metadata: Dict[str, Any]) -> str:
+    return f"GitHub: {metadata.get('repo_name', 'Unknown Repository')}"
+
+
+def _fmt_default_source(metadata: Dict[str, Any]) -> str:
+    return metadata.get('source', 'Unknown Source')
+
+
+def _format_context(docs: Sequence[Document], sources_info: Sequence[str]) -> str:
+    """Join retrieved documents and their citations into the prompt context."""
+    return "\n\n".join(f"{doc.page_content}\n[Source: {source_info}]" for doc, source_info in zip(docs, sources_info))
+
+
+_SENTENCE_END = re.compile(r'[.!?]\s+')
+
+
+def _split_complete_sentences(text: str) -> Tuple[str, str]:
+    """Split streamed text into (complete sentences, unfinished remainder)."""
+    last = None
+    for last in _SENTENCE_END.finditer(text):
+        pass
+    if last is None:
+        return "", text
+    return text[:last.end()], text[last.end():]
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 class ModelConfig:
     """Configuration class for managing different model providers."""
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_llm():
-        """Get the configured language model based on environment variables."""
+        """
+        Get the configured language model based on environment variables.
+        The instance is created once and shared by every caller.
+        """
         provider = os.getenv("MODEL_PROVIDER", "ollama").lower()
         
         if provider == "openai":
@@ -42,8 +425,9 @@ class ModelConfig:
             if not api_key:
                 raise ValueError("OPENAI_API_KEY is required when using OpenAI provider")
             
+            # gpt-4o applies automatic prompt caching to the static persona prefix
             return ChatOpenAI(
-                model_name="gpt-4",
+                model_name=os.getenv("OPENAI_MODEL", "gpt-4o"),
                 temperature=0.1,
                 openai_api_key=api_key
             )
@@ -52,28 +436,90 @@ class ModelConfig:
             base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
             model_name = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
             
-            try:
-                # Test Ollama connection
-                import requests
-                response = requests.get(f"{base_url}/api/tags", timeout=5)
-                if response.status_code != 200:
-                    raise ConnectionError("Cannot connect to Ollama server")
-            except Exception as e:
-                logger.error(f"Ollama connection failed: {e}")
-                raise ConnectionError(f"Cannot connect to Ollama at {base_url}. Make sure Ollama is running.")
+            global _ollama_probed
+            if not _ollama_probed:
+                try:
+                    # Test Ollama connection once per process
+                    response = _get_ollama_client().get("/api/tags")
+                    if response.status_code != 200:
+                        raise ConnectionError("Cannot connect to Ollama server")
+                except Exception as e:
+                    logger.error(f"Ollama connection failed: {e}")
+                    raise ConnectionError(f"Cannot connect to Ollama at {base_url}. Make sure Ollama is running.")
+                _ollama_probed = True
             
+            # Keep the model resident between requests so the KV cache for the
+            # shared system prompt prefix survives across turns
             return ChatOllama(
                 model=model_name,
                 base_url=base_url,
-                temperature=0.1
+                temperature=0.1,
+                num_ctx=int(os.getenv("OLLAMA_NUM_CTX", "4096")),
+                keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m")
             )
         
         else:
             raise ValueError(f"Unsupported model provider: {provider}")
     
     @staticmethod
+    def reset():
+        """Drop the shared model instances so the next call re-reads the configuration."""
+        global _ollama_probed
+        ModelConfig.get_llm.cache_clear()
+        ModelConfig.get_embeddings.cache_clear()
+        _ollama_probed = False
+    
+    @staticmethod
+    def get_chroma_client(db_path: Path, **settings):
+        """
+        Get the ChromaDB client: a Chroma server when CHROMA_HOST is set,
+        otherwise embedded persistent storage at `db_path`.
+        """
+        chroma_settings = Settings(anonymized_telemetry=False, **settings)
+        
+        host = os.getenv("CHROMA_HOST")
+        if host:
+            return chromadb.HttpClient(
+                host=host,
+                port=int(os.getenv("CHROMA_PORT", "8000")),
+                settings=chroma_settings
+            )
+        
+        return chromadb.PersistentClient(path=str(db_path), settings=chroma_settings)
+    
+    @staticmethod
+    def get_sources_collection(chroma_client):
+        """
+        Collection holding the metadata shared by all chunks of a source, one record per
+        source_id (metadata as a JSON document). It lives next to the knowledge base,
+        so it is available wherever the Chroma server is.
+        """
+        return chroma_client.get_or_create_collection(SOURCES_COLLECTION)
+    
+    @staticmethod
+    def load_sources(chroma_client, source_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Read the sources table (or just `source_ids`), keyed by source_id."""
+        data = ModelConfig.get_sources_collection(chroma_client).get(ids=source_ids, include=["documents"])
+        return {source_id: json.loads(doc) for source_id, doc in zip(data["ids"], data["documents"])}
+    
+    @staticmethod
+    def get_collection_metadata() -> Dict[str, Any]:
+        """Get the HNSW index settings for the knowledge base collection."""
+        return {
+            "hnsw:space": "cosine",
+            "hnsw:M": int(os.getenv("CHROMA_HNSW_M", "32")),
+            "hnsw:construction_ef": int(os.getenv("CHROMA_HNSW_EF_CONSTRUCTION", "200")),
+            "hnsw:search_ef": int(os.getenv("CHROMA_HNSW_EF_SEARCH", "40")),
+            "hnsw:num_threads": os.cpu_count() or 1
+        }
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_embeddings():
-        """Get the configured embedding model based on environment variables."""
+        """
+        Get the configured embedding model based on environment variables.
+        The model is loaded once and shared, so its weights are never duplicated.
+        """
         provider = os.getenv("EMBEDDING_PROVIDER", "local").lower()
         
         if provider == "openai":
@@ -83,13 +529,40 @@ class ModelConfig:
             
             return OpenAIEmbeddings(openai_api_key=api_key)
         
+        elif provider == "tei":
+            # Text-Embeddings-Inference / Infinity serve the OpenAI embeddings API and
+            # batch dynamically on the server; they take raw strings, not token ids
+            return OpenAIEmbeddings(
+                openai_api_base=os.getenv("TEI_URL", "http://localhost:8080/v1"),
+                openai_api_key="unused",
+                model=os.getenv("TEI_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+                check_embedding_ctx_length=False
+            )
+        
         elif provider == "local":
             model_name = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+            device = os.getenv("EMBEDDING_DEVICE") or (
+                "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
+            )
+            
+            # On CPU, use the int8 ONNX export when it has been generated (scripts/export_onnx.py)
+            onnx_path = Path(os.getenv("LOCAL_ONNX_MODEL", f"models/{Path(model_name).name}-int8.onnx"))
+            if device == "cpu" and onnxruntime is not None and onnx_path.exists():
+                logger.info(f"Using ONNX Runtime int8 embeddings: {onnx_path}")
+                tokenizer_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+                return LocalOnnxEmbeddings(str(onnx_path), tokenizer_name=tokenizer_name)
             
+            # Pin the Rust-backed fast tokenizer (forwarded to SentenceTransformer);
+            # a GPU needs much larger batches to be saturated
+            logger.info(f"Using sentence-transformers embeddings on {device}")
             return HuggingFaceEmbeddings(
                 model_name=model_name,
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
+                model_kwargs={'device': device, 'tokenizer_kwargs': {'use_fast': True}},
+                encode_kwargs={
+                    'normalize_embeddings': True,
+                    'batch_size': 256 if device.startswith("cuda") else 32,
+                    'convert_to_numpy': True
+                }
             )
         
         else:
@@ -103,9 +576,18 @@ class VitaeAgent:
     Supports both local (Ollama) and cloud (OpenAI) models.
     """
     
+    # Citation formatter per document source type
+    _SOURCE_FORMATTERS = {
+        "pdf": _fmt_pdf_source,
+        "text": _fmt_text_source,
+        "blog": _fmt_blog_source,
+        "github": _fmt_github_source,
+    }
+    
     def __init__(self):
         """Initialize the VitaeAgent with all necessary components."""
         self.db_path = Path("db")
+        self._sources = self._load_sources()
         
         # Initialize embeddings based on configuration
         logger.info("Initializing embedding model...")
@@ -121,8 +603,9 @@ class VitaeAgent:
         try:
             self.llm = ModelConfig.get_llm()
             provider = os.getenv("MODEL_PROVIDER", "ollama")
-            model = os.getenv("OLLAMA_MODEL", "llama3.1:8b") if provider == "ollama" else "gpt-4"
+            model = os.getenv("OLLAMA_MODEL", "llama3.1:8b") if provider == "ollama" else os.getenv("OPENAI_MODEL", "gpt-4o")
             logger.info(f"LLM provider: {provider}, model: {model}")
+            logger.info(f"System prompt cache_key: {SYSTEM_PROMPT_CACHE_KEY}")
         except Exception as e:
             logger.error(f"Failed to initialize LLM: {e}")
             raise
@@ -130,6 +613,11 @@ class VitaeAgent:
         # Initialize ChromaDB client and retriever
         self._init_retriever()
         
+        # Caches for repeated questions, cleared by invalidate_caches()
+        self._retrieve_cached = functools.lru_cache(maxsize=_RETRIEVAL_CACHE_SIZE)(self._retrieve)
+        self._response_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._last_health: Optional[Tuple[float, Dict[str, Any]]] = None
+        
         # Initialize Google Translate client (optional)
         self.translator = None
         try:
@@ -147,13 +635,28 @@ class VitaeAgent:
     def _init_retriever(self):
         """Initialize the ChromaDB retriever."""
         try:
-            chroma_client = chromadb.PersistentClient(
-                path=str(self.db_path),
-                settings=Settings(anonymized_telemetry=False)
-            )
+            chroma_client = ModelConfig.get_chroma_client(self.db_path)
             
             collection = chroma_client.get_collection("vitae_knowledge")
             
+            # Graph parameters are fixed at creation, but the query-time beam width can be retuned
+            search_ef = ModelConfig.get_collection_metadata()["hnsw:search_ef"]
+            current_metadata = collection.metadata or {}
+            if current_metadata.get("hnsw:search_ef") != search_ef:
+                try:
+                    try:
+                        # chromadb >= 1.0 keeps mutable index settings in the collection configuration
+                        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                    except TypeError:
+                        # Older versions read them from metadata, but reject any creation-only key
+                        mutable_metadata = {
+                            key: value for key, value in current_metadata.items()
+                            if key not in _HNSW_CREATION_ONLY_KEYS
+                        }
+                        collection.modify(metadata={**mutable_metadata, "hnsw:search_ef": search_ef})
+                except Exception as e:
+                    logger.warning(f"Could not update hnsw:search_ef on existing collection: {e}")
+            
             # Create Langchain Chroma wrapper
             self.vectorstore = Chroma(
                 client=chroma_client,
@@ -161,87 +664,38 @@ class VitaeAgent:
                 embedding_function=self.embeddings
             )
             
-            # Create retriever with similarity search
-            self.retriever = self.vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": 5}
-            )
+            retriever_type = os.getenv("RETRIEVER_TYPE", "mmr").lower()
+            if retriever_type == "mmr":
+                # Diverse top-k so near-duplicate chunks don't crowd the prompt
+                self.retriever = MMRRetriever(collection=collection, embeddings=self.embeddings, k=5, fetch_k=20)
+            elif retriever_type == "sq8":
+                # In-process SQ8 search over a snapshot of the collection
+                self.retriever = SQ8Retriever.from_collection(collection, self.embeddings, k=5, fetch_k=20)
+            else:
+                # Create retriever with similarity search
+                self.retriever = self.vectorstore.as_retriever(
+                    search_type="similarity",
+                    search_kwargs={"k": 5}
+                )
             
-            logger.info("Successfully initialized retriever")
+            logger.info(f"Successfully initialized {retriever_type} retriever")
             
         except Exception as e:
             logger.error(f"Error initializing retriever: {e}")
             raise
 
-    def _create_system_prompt(self) -> str:
-        """Create the comprehensive system prompt that defines the agent's persona."""
-        return """You are the VitaeAgent, a sophisticated digital professional persona that represents a specific individual's career, skills, and accomplishments. You are NOT a general assistant - you are the digital embodiment of this person's professional identity.
-
-## Core Personality Traits:
-
-**Meticulously Factual**: You never speculate or invent information. Your knowledge is strictly confined to the provided context documents. If information is not in your knowledge base, you clearly state that you don't have that information.
-
-**Proactively Helpful**: You don't just answer questions - you engage meaningfully. If a query is vague, you ask clarifying questions to guide the conversation toward more insightful exchanges.
-
-**Transparent & Trustworthy**: Every key claim you make must be backed by a citation in the format [Source: filename, Page X] or [Source: URL] or [Source: GitHub: repository-name]. This builds immediate trust with users.
-
-**Professional & Engaging**: You communicate in a professional yet personable tone, as if you are the person yourself speaking about their career journey.
-
-## Response Guidelines:
-
-1. **Source Citations**: Always cite your sources for factual claims using the format [Source: document_name] or [Source: URL]. This is critical for building trust.
-
-2. **Scope Boundaries**: Only discuss information from your knowledge base. For questions outside this scope, politely explain that you don't have that information and suggest focusing on areas where you can provide detailed insights.
-
-3. **Proactive Engagement**: When appropriate, suggest related topics or ask clarifying questions to deepen the conversation. For example: "Would you like to know more about the specific technologies used in that project?"
-
-4. **Professional Tone**: Speak as the professional would speak about themselves - confident but not boastful, detailed but not overwhelming.
-
-## Example Response Patterns:
-
-For specific achievements: "In the Project Phoenix initiative, I led a team of 5 developers to implement a cloud migration strategy that reduced infrastructure costs by 40% [Source: portfolio.pdf, Page 3]. The project involved extensive work with AWS services and DevOps practices."
-
-For skill inquiries: "My experience with Python spans over 8 years, including work on machine learning projects, web development with Django and FastAPI, and automation scripts [Source: cv.pdf, Page 1]. Would you like me to elaborate on any specific Python applications?"
-
-For unknown information: "I don't have specific information about that particular framework in my knowledge base. However, I can share details about my experience with related technologies like React and Vue.js [Source: github_projects]."
-
-Remember: You are this person's professional advocate and representative. Your goal is to provide accurate, engaging, and helpful information that showcases their capabilities and experience while maintaining complete honesty about the bounds of your knowledge."""
-
     def _create_rag_chain(self):
         """Create the RAG chain using LangChain Expression Language (LCEL)."""
         
-        # Create the prompt template
-        system_prompt = SystemMessagePromptTemplate.from_template(self._create_system_prompt())
+        self.chat_prompt = _CHAT_PROMPT
         
-        human_prompt = HumanMessagePromptTemplate.from_template(
-            """Based on the following context about this professional's background, please answer the user's question. Remember to cite your sources.
-
-Context:
-{context}
-
-User Question: {question}
-
-Please provide a comprehensive, well-cited response that stays within the bounds of the provided context."""
-        )
-        
-        self.chat_prompt = ChatPromptTemplate.from_messages([
-            system_prompt,
-            human_prompt
-        ])
-        
-        # Create the RAG chain
-        def format_docs(docs):
-            """Format documents for context."""
-            formatted_docs = []
-            for doc in docs:
-                source_info = self._extract_source_info(doc.metadata)
-                content = f"{doc.page_content}\n[Source: {source_info}]"
-                formatted_docs.append(content)
-            return "\n\n".join(formatted_docs)
-        
-        # Create the chain using LCEL
+        # Create the chain using LCEL. Retrieval happens once in chat(), so the chain
+        # takes the already-fetched documents and their citations.
         self.rag_chain = (
-            {"context": self.retriever | format_docs, "question": RunnablePassthrough()}
+            {
+                "context": RunnableLambda(lambda x: _format_context(x["docs"], x["sources_info"])),
+                "question": RunnableLambda(lambda x: x["question"])
+            }
             | self.chat_prompt
             | self.llm
             | StrOutputParser()
@@ -251,55 +705,130 @@ Please provide a comprehensive, well-cited response that stays within the bounds
 
     def _extract_source_info(self, metadata: Dict[str, Any]) -> str:
         """Extract readable source information from document metadata."""
-        source_type = metadata.get('source_type', 'unknown')
-        
-        if source_type == 'pdf':
-            source = metadata.get('source', 'Unknown PDF')
-            page = metadata.get('page', '')
-            return f"{source}" + (f", Page {page + 1}" if page != '' else "")
-        
-        elif source_type == 'text':
-            return metadata.get('source', 'Unknown Text File')
-        
-        elif source_type == 'blog':
-            title = metadata.get('title', 'Blog Post')
-            url = metadata.get('url', '')
-            return f"{title} - {url}" if url else title
-        
-        elif source_type == 'github':
-            repo_name = metadata.get('repo_name', 'Unknown Repository')
-            return f"GitHub: {repo_name}"
-        
-        else:
-            return metadata.get('source', 'Unknown Source')
+        return self._SOURCE_FORMATTERS.get(metadata.get('source_type'), _fmt_default_source)(metadata)
 
     def translate_text(self, text: str, target_language: str) -> str:
-        """Translate text to the target language using Google Translate."""
-        if not self.translator or target_language.lower() in ['en', 'english']:
+        """
+        Translate text to the target language using Google Translate.
+        
+        The source language is detected by the translate call itself, so this
+        is a single API round trip; text already in the target language is
+        returned unchanged.
+        """
+        if not self.translator:
             return text
         
         try:
-            # Detect source language
-            detection = self.translator.detect(text)
-            source_lang = detection['language']
+            result = self.translator.translate(text, target_language=target_language)
             
             # Skip translation if already in target language
-            if source_lang == target_language:
+            if result.get('detectedSourceLanguage') == target_language:
                 return text
             
-            # Translate
-            result = self.translator.translate(
-                text, 
-                target_language=target_language,
-                source_language=source_lang
-            )
-            
             return result['translatedText']
             
         except Exception as e:
             logger.error(f"Translation error: {e}")
             return text
 
+    def _translate_segment(self, segment: str, language: str) -> str:
+        """Translate a chunk of generated text, keeping its trailing whitespace."""
+        text = segment.rstrip()
+        return self.translate_text(text, language) + segment[len(text):] if text else segment
+
+    def _retrieve(self, norm_query: str) -> Tuple[Tuple[Document, ...], Tuple[str, ...]]:
+        """
+        Embed and search for a normalized query. Memoized via `_retrieve_cached`.
+        
+        Returns the documents together with their formatted citations, which are
+        shared by the prompt context and the API sources list.
+        """
+        retrieved = self.retriever.get_relevant_documents(norm_query)
+        self._fetch_new_sources(retrieved)
+        docs = tuple(self._resolve_source(doc) for doc in retrieved)
+        return docs, tuple(self._extract_source_info(doc.metadata) for doc in docs)
+
+    def _load_sources(self) -> Dict[str, Dict[str, Any]]:
+        """Load the per-source metadata table written by the ingestion script."""
+        self._missing_sources = set()
+        try:
+            return ModelConfig.load_sources(ModelConfig.get_chroma_client(self.db_path))
+        except Exception as e:
+            logger.error(f"Could not load source metadata, citations will be incomplete: {e}")
+            return {}
+
+    def _fetch_new_sources(self, docs: Sequence[Document]):
+        """Look up sources ingested since startup, so their chunks are cited right away."""
+        unknown = sorted({
+            doc.metadata["source_id"] for doc in docs
+            if doc.metadata.get("source_id") is not None and doc.metadata["source_id"] not in self._sources
+        })
+        if not unknown:
+            return
+        try:
+            self._sources.update(ModelConfig.load_sources(ModelConfig.get_chroma_client(self.db_path), unknown))
+        except Exception as e:
+            logger.error(f"Could not fetch source metadata for {unknown}: {e}")
+
+    def _resolve_source(self, doc: Document) -> Document:
+        """Expand a chunk's source_id into the metadata stored once for its source."""
+        source_id = doc.metadata.get("source_id")
+        source = self._sources.get(source_id)
+        if source is None:
+            if source_id is not None and source_id not in self._missing_sources:
+                self._missing_sources.add(source_id)
+                logger.error(f"Chunk references unknown source_id {source_id}; re-run ingestion")
+            return doc
+        return Document(page_content=doc.page_content, metadata={**source, **doc.metadata})
+
+    def _get_cached_response(self, query: str, language: str) -> Optional[Dict[str, Any]]:
+        """Return a previously generated answer for the same question and language."""
+        key = (_normalize_query(query), language.lower())
+        cached = self._response_cache.get(key)
+        if cached is None:
+            return None
+        self._response_cache.move_to_end(key)
+        return {**cached, "original_query": query}
+
+    def _store_response(self, query: str, language: str, result: Dict[str, Any]):
+        """Remember a generated answer, evicting the least recently used one."""
+        key = (_normalize_query(query), language.lower())
+        self._response_cache[key] = result
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+
+    def invalidate_caches(self):
+        """Drop cached retrievals and answers, e.g. after new data was ingested."""
+        self._retrieve_cached.cache_clear()
+        self._response_cache.clear()
+        self._sources = self._load_sources()
+        if isinstance(self.retriever, SQ8Retriever):
+            # The SQ8 index is a snapshot of the collection
+            self._init_retriever()
+
+    @staticmethod
+    def _build_sources(source_docs: Sequence[Document], sources_info: Sequence[str]) -> List[Dict[str, Any]]:
+        """Build the API sources list from retrieved documents."""
+        sources = [None] * len(source_docs)
+        for i, doc in enumerate(source_docs):
+            content = doc.page_content
+            preview = content if len(content) <= 200 else f"{content[:200]}..."
+            sources[i] = {"source": sources_info[i], "content_preview": preview}
+        return sources
+
+    @staticmethod
+    def _error_result(query: str, language: str, error: Exception) -> Dict[str, Any]:
+        """Build the response returned when a chat turn fails."""
+        return {
+            "response": "I apologize, but I encountered an error while processing your question. Please try again or rephrase your question.",
+            "sources": [],
+            "original_query": query,
+            "processed_query": query,
+            "language": language,
+            "error": str(error)
+        }
+
     def chat(self, query: str, language: str = "en") -> Dict[str, Any]:
         """
         Main chat interface for the VitaeAgent.
@@ -311,31 +840,31 @@ Please provide a comprehensive, well-cited response that stays within the bounds
         Returns:
             Dictionary containing the response and metadata
         """
+        cached = self._get_cached_response(query, language)
+        if cached is not None:
+            return cached
+        
         try:
             # Translate query to English if needed
+            needs_translation = self.translator is not None and language.lower() not in _PASSTHROUGH_LANGS
             english_query = query
-            if language.lower() not in ['en', 'english'] and self.translator:
+            if needs_translation:
                 english_query = self.translate_text(query, 'en')
             
+            # Retrieve source documents once; they feed both the prompt and the sources list
+            source_docs, sources_info = self._retrieve_cached(_normalize_query(english_query))
+            
             # Get response from RAG chain
-            response = self.rag_chain.invoke(english_query)
+            response = self.rag_chain.invoke({"docs": source_docs, "sources_info": sources_info, "question": english_query})
             
             # Translate response back to target language if needed
             final_response = response
-            if language.lower() not in ['en', 'english'] and self.translator:
+            if needs_translation:
                 final_response = self.translate_text(response, language)
             
-            # Retrieve source documents for additional context
-            source_docs = self.retriever.get_relevant_documents(english_query)
-            sources = []
-            for doc in source_docs:
-                source_info = self._extract_source_info(doc.metadata)
-                sources.append({
-                    "source": source_info,
-                    "content_preview": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-                })
-            
-            return {
+            sources = self._build_sources(source_docs, sources_info)
+            
+            result = {
                 "response": final_response,
                 "sources": sources,
                 "original_query": query,
@@ -343,47 +872,204 @@ Please provide a comprehensive, well-cited response that stays within the bounds
                 "language": language,
                 "source_count": len(sources)
             }
+            self._store_response(query, language, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error in chat: {e}")
-            return {
-                "response": "I apologize, but I encountered an error while processing your question. Please try again or rephrase your question.",
-                "sources": [],
+            return self._error_result(query, language, e)
+
+    async def achat(self, query: str, language: str = "en") -> Dict[str, Any]:
+        """
+        Async variant of chat() that never blocks the event loop.
+        
+        Translation and ChromaDB retrieval run in worker threads and the LLM
+        call goes through the chain's native async path.
+        """
+        cached = self._get_cached_response(query, language)
+        if cached is not None:
+            return cached
+        
+        try:
+            needs_translation = self.translator is not None and language.lower() not in _PASSTHROUGH_LANGS
+            english_query = query
+            if needs_translation:
+                english_query = await self._atranslate_query(query)
+            
+            source_docs, sources_info = await asyncio.to_thread(self._retrieve_cached, _normalize_query(english_query))
+            
+            response = await self.rag_chain.ainvoke({"docs": source_docs, "sources_info": sources_info, "question": english_query})
+            
+            final_response = response
+            if needs_translation:
+                final_response = await asyncio.to_thread(self.translate_text, response, language)
+            
+            sources = self._build_sources(source_docs, sources_info)
+            
+            result = {
+                "response": final_response,
+                "sources": sources,
                 "original_query": query,
-                "processed_query": query,
+                "processed_query": english_query,
                 "language": language,
-                "error": str(e)
+                "source_count": len(sources)
             }
+            self._store_response(query, language, result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error in chat: {e}")
+            return self._error_result(query, language, e)
+
+    async def astream_chat(self, query: str, language: str = "en") -> AsyncIterator[str]:
+        """
+        Stream a chat turn as Server-Sent Events.
+        
+        Emits a `sources` event once retrieval finishes, one `token` event per
+        generated chunk, and a final `done` event (or `error` on failure).
+        Responses that need translation are translated sentence by sentence
+        while generation continues.
+        """
+        cached = self._get_cached_response(query, language)
+        if cached is not None:
+            yield _sse_event("sources", {"sources": cached["sources"], "source_count": cached["source_count"]})
+            yield _sse_event("token", {"text": cached["response"]})
+            yield _sse_event("done", {
+                "original_query": query,
+                "processed_query": cached["processed_query"],
+                "language": language
+            })
+            return
+        
+        try:
+            needs_translation = self.translator is not None and language.lower() not in _PASSTHROUGH_LANGS
+            english_query = query
+            if needs_translation:
+                english_query = await self._atranslate_query(query)
+            
+            source_docs, sources_info = await asyncio.to_thread(self._retrieve_cached, _normalize_query(english_query))
+            sources = self._build_sources(source_docs, sources_info)
+            yield _sse_event("sources", {"sources": sources, "source_count": len(sources)})
+            
+            chunks = []
+            if not needs_translation:
+                async for chunk in self.rag_chain.astream({"docs": source_docs, "sources_info": sources_info, "question": english_query}):
+                    chunks.append(chunk)
+                    yield _sse_event("token", {"text": chunk})
+            else:
+                # Translate complete sentences while the model keeps generating,
+                # emitting translations in order as soon as they are ready
+                pending = deque()
+                buffer = ""
+                async for chunk in self.rag_chain.astream({"docs": source_docs, "sources_info": sources_info, "question": english_query}):
+                    complete, buffer = _split_complete_sentences(buffer + chunk)
+                    if complete:
+                        pending.append(asyncio.create_task(asyncio.to_thread(self._translate_segment, complete, language)))
+                    while pending and pending[0].done():
+                        translated = pending.popleft().result()
+                        chunks.append(translated)
+                        yield _sse_event("token", {"text": translated})
+                
+                if buffer:
+                    pending.append(asyncio.create_task(asyncio.to_thread(self._translate_segment, buffer, language)))
+                while pending:
+                    translated = await pending.popleft()
+                    chunks.append(translated)
+                    yield _sse_event("token", {"text": translated})
+            
+            final_response = "".join(chunks)
+            
+            self._store_response(query, language, {
+                "response": final_response,
+                "sources": sources,
+                "original_query": query,
+                "processed_query": english_query,
+                "language": language,
+                "source_count": len(sources)
+            })
+            yield _sse_event("done", {
+                "original_query": query,
+                "processed_query": english_query,
+                "language": language
+            })
+            
+        except Exception as e:
+            logger.error(f"Error in streaming chat: {e}")
+            yield _sse_event("error", {"message": "An error occurred while processing your request"})
 
     def get_suggested_questions(self) -> List[str]:
         """Get a list of suggested questions to help users get started."""
-        return [
-            "What is your professional background?",
-            "Tell me about your most significant project.",
-            "What programming languages and technologies do you work with?",
-            "What are your key achievements in your career?",
-            "Describe your leadership experience.",
-            "What industries have you worked in?",
-            "Tell me about your education and certifications.",
-            "What type of challenges do you excel at solving?",
-            "Show me examples of your technical work.",
-            "What makes you unique as a professional?"
-        ]
+        return list(SUGGESTED_QUESTIONS)
+
+    def warm_up(self):
+        """
+        Pay first-use costs at startup instead of on the first user request:
+        the embedding model's lazy initialization and, for Ollama, loading the
+        model into memory (pinned for OLLAMA_KEEP_ALIVE).
+        """
+        self.embeddings.embed_query("warmup")
+        self._preload_llm()
+
+    def _preload_llm(self):
+        """Ask Ollama to load the model and keep it resident (no-op for other providers)."""
+        if os.getenv("MODEL_PROVIDER", "ollama").lower() != "ollama":
+            return
+        
+        # An empty prompt loads the model without generating anything
+        response = _get_ollama_client().post(
+            "/api/generate",
+            json={
+                "model": os.getenv("OLLAMA_MODEL", "llama3.1:8b"),
+                "prompt": "",
+                "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+                "stream": False
+            },
+            timeout=120.0
+        )
+        response.raise_for_status()
+
+    async def _apreload_llm(self):
+        """Preload the model in the background; failures only cost the overlap."""
+        try:
+            await asyncio.to_thread(self._preload_llm)
+        except Exception as e:
+            logger.debug(f"Background model preload failed: {e}")
+
+    async def _atranslate_query(self, query: str) -> str:
+        """Translate the query to English while the model is loaded in parallel."""
+        english_query, _ = await asyncio.gather(
+            asyncio.to_thread(self.translate_text, query, 'en'),
+            self._apreload_llm()
+        )
+        return english_query
 
     def health_check(self) -> Dict[str, Any]:
-        """Perform a health check of the agent's components."""
+        """
+        Perform a health check of the agent's components.
+        
+        The full check queries the retriever and runs an LLM inference, so its
+        result is reused for `_HEALTH_CACHE_TTL` seconds.
+        """
+        if self._last_health is not None:
+            checked_at, cached_status = self._last_health
+            if time.monotonic() - checked_at < _HEALTH_CACHE_TTL:
+                return dict(cached_status)
+        
         status = {
             "retriever_ready": False,
             "llm_ready": False,
             "database_count": 0,
             "translator_available": self.translator is not None,
             "model_provider": os.getenv("MODEL_PROVIDER", "ollama"),
+            "prompt_cache_key": SYSTEM_PROMPT_CACHE_KEY,
             "embedding_provider": os.getenv("EMBEDDING_PROVIDER", "local")
         }
         
         try:
-            # Test retriever
+            # Test retriever, timing it as a signal for HNSW tuning
+            start = time.perf_counter()
             test_results = self.retriever.get_relevant_documents("test")
+            status["retriever_latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
             status["retriever_ready"] = True
             status["database_count"] = len(test_results)
             
@@ -395,15 +1081,14 @@ Please provide a comprehensive, well-cited response that stays within the bounds
             logger.error(f"Health check error: {e}")
             status["error"] = str(e)
         
-        return status
+        self._last_health = (time.monotonic(), status)
+        return dict(status)
 
     @staticmethod
     def check_ollama_models():
         """Check available Ollama models."""
         try:
-            import requests
-            base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-            response = requests.get(f"{base_url}/api/tags", timeout=5)
+            response = _get_ollama_client().get("/api/tags")
             
             if response.status_code == 200:
                 models = response.json().get("models", [])
@@ -5,13 +5,14 @@ through a REST API interface.
 """
 
 import os
+import asyncio
 import logging
 from typing import Dict, Any, List
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -68,6 +69,14 @@ async def lifespan(app: FastAPI):
         logger.info("Initializing VitaeAgent...")
         agent = get_agent()
         logger.info("VitaeAgent initialized successfully")
+        
+        # Warm models so the first request doesn't pay cold-start latency
+        try:
+            await asyncio.to_thread(agent.warm_up)
+            logger.info("VitaeAgent warmed up")
+        except Exception as e:
+            logger.warning(f"VitaeAgent warm-up failed: {e}")
+        
         yield
     except Exception as e:
         logger.error(f"Failed to initialize VitaeAgent: {e}")
@@ -81,7 +90,8 @@ app = FastAPI(
     title="VitaeAgent API",
     description="An intelligent conversational interface for professional background information",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -132,7 +142,7 @@ async def chat(request: ChatRequest):
         
         # Process the chat request
         logger.info(f"Processing chat request: {request.query[:100]}...")
-        result = agent.chat(request.query, request.language)
+        result = await agent.achat(request.query, request.language)
         
         # Check for errors in the result
         if "error" in result:
@@ -154,12 +164,69 @@ async def chat(request: ChatRequest):
         )
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint.
+    
+    Returns the agent's answer as Server-Sent Events so clients can render
+    tokens as soon as the model produces them. Events: `sources`, `token`,
+    `done` and `error`.
+    """
+    global agent
+    
+    if agent is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="VitaeAgent is not initialized"
+        )
+    
+    if not request.query.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query cannot be empty"
+        )
+    
+    logger.info(f"Processing streaming chat request: {request.query[:100]}...")
+    return StreamingResponse(
+        agent.astream_chat(request.query, request.language),
+        media_type="text/event-stream"
+    )
+
+
+@app.get("/live", response_model=HealthResponse)
+async def liveness(response: Response):
+    """
+    Liveness probe.
+    
+    Only reports whether the agent is initialized; it never touches the LLM
+    or the vector database, so it is safe to poll frequently. Answers 503
+    while the agent is not initialized, since probes look at the status code.
+    """
+    global agent
+    
+    if agent is None:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return HealthResponse(
+            status="unhealthy",
+            components={"agent": "not_initialized"},
+            version="1.0.0"
+        )
+    
+    return HealthResponse(
+        status="healthy",
+        components={"agent": "initialized"},
+        version="1.0.0"
+    )
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
     Health check endpoint to verify the status of all components.
     
     Returns the status of the agent, database, LLM, and other components.
+    Results are cached briefly by the agent; use /live for cheap liveness probes.
     """
     global agent
     
@@ -172,7 +239,7 @@ async def health_check():
             )
         
         # Perform comprehensive health check
-        health_data = agent.health_check()
+        health_data = await asyncio.to_thread(agent.health_check)
         
         # Determine overall status
         overall_status = "healthy"
@@ -240,7 +307,7 @@ async def get_stats():
     
     try:
         # Get basic stats from the health check
-        health_data = agent.health_check()
+        health_data = await asyncio.to_thread(agent.health_check)
         
         stats = {
             "knowledge_base_size": health_data.get("database_count", 0),
@@ -264,7 +331,7 @@ async def get_stats():
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Handle HTTP exceptions with consistent format."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": {
@@ -280,7 +347,7 @@ async def http_exception_handler(request, exc):
 async def general_exception_handler(request, exc):
     """Handle general exceptions."""
     logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": {
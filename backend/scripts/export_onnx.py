@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+VitaeAgent ONNX Export Script
+This script converts the local sentence-transformers embedding model to ONNX
+and applies int8 dynamic quantization so it can be served by ONNX Runtime.
+"""
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+from pathlib import Path
+
+from dotenv import load_dotenv
+from optimum.exporters.onnx import main_export
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def export_quantized_model(model_name: str, output_path: Path):
+    """Export `model_name` to ONNX and write an int8-quantized copy to `output_path`."""
+    hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        logger.info(f"Exporting {hub_name} to ONNX...")
+        main_export(
+            model_name_or_path=hub_name,
+            output=export_dir,
+            task="feature-extraction"
+        )
+
+        logger.info("Applying int8 dynamic quantization...")
+        quantize_dynamic(
+            model_input=str(Path(export_dir) / "model.onnx"),
+            model_output=str(output_path),
+            weight_type=QuantType.QInt8
+        )
+
+        # Ship the fast tokenizer next to the model so it loads without the Hub
+        shutil.copy(Path(export_dir) / "tokenizer.json", output_path.with_name("tokenizer.json"))
+
+    logger.info(f"Quantized model written to {output_path}")
+
+
+def main():
+    """Main entry point for the export script."""
+    model_name = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    output_path = Path(os.getenv("LOCAL_ONNX_MODEL", f"models/{Path(model_name).name}-int8.onnx"))
+
+    try:
+        export_quantized_model(model_name, output_path)
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,25 +6,56 @@ and building a persistent vector database for intelligent retrieval.
 """
 
 import os
+import json
+import re
 import sys
+import hashlib
+import itertools
+import queue
+import sqlite3
+import asyncio
+import threading
 import logging
+from collections import defaultdict, deque
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterator, Callable
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+import aiohttp
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+import numpy as np
+import tiktoken
+from tokenizers import Tokenizer
 
 # Add the parent directory to Python path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from dotenv import load_dotenv
-import chromadb
-from chromadb.config import Settings
-from langchain.document_loaders import PyPDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import fitz  # PyMuPDF
+from pdfminer.pdfparser import PDFSyntaxError
+from langchain.document_loaders import PDFPlumberLoader, TextLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter, MarkdownHeaderTextSplitter
 from langchain.schema import Document
-from langchain.embeddings import OpenAIEmbeddings, HuggingFaceEmbeddings
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+from app.agent import ModelConfig
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    from readability import Document as ReadabilityDocument
+except ImportError:
+    ReadabilityDocument = None
+
+# Errors that mean "retry with a smaller batch" (nothing to catch without torch)
+_CUDA_OOM_ERRORS = (torch.cuda.OutOfMemoryError,) if torch is not None else ()
 
 # Load environment variables
 load_dotenv()
@@ -36,6 +67,457 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Chunks are sized in the embedding model's own tokens, capped by its input window
+CHUNK_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 50
+
+# Errors that mean a file itself is unreadable: record it and move on
+_BAD_FILE_ERRORS = (OSError, ValueError, RuntimeError, fitz.FileDataError, PDFSyntaxError)
+
+# Metadata that is identical for every chunk of a source; stored once in the sources table
+_SOURCE_METADATA_KEYS = (
+    "source", "source_type", "file_path", "total_pages", "title", "url",
+    "repo_name", "repo_url", "language", "topics",
+    # PDF document info, as copied onto every page by pdfplumber
+    "Title", "Author", "Subject", "Keywords", "Creator", "Producer",
+    "CreationDate", "ModDate", "Trapped"
+)
+
+# README sections start at H1-H3 headings
+_README_HEADING = re.compile(r'^(?=#{1,3} )', re.MULTILINE)
+
+
+def _tei_max_input_length() -> int:
+    """
+    The longest input the embedding server accepts: TEI_MAX_INPUT_LENGTH, else the
+    server's /info (TEI rejects longer inputs unless started with --auto-truncate).
+    """
+    if os.getenv("TEI_MAX_INPUT_LENGTH"):
+        return int(os.getenv("TEI_MAX_INPUT_LENGTH"))
+    
+    base_url = os.getenv("TEI_URL", "http://localhost:8080/v1").rstrip("/")
+    if base_url.endswith("/v1"):
+        base_url = base_url[:-3]
+    try:
+        response = requests.get(f"{base_url}/info", timeout=10)
+        response.raise_for_status()
+        return int(response.json()["max_input_length"])
+    except (requests.RequestException, KeyError, ValueError) as e:
+        # MiniLM-class models accept 256 tokens; anything larger is the operator's call
+        logger.warning(f"Could not read max_input_length from {base_url}/info ({e}); assuming 256")
+        return 256
+
+
+def _build_token_counter(embeddings) -> Tuple[Callable[[str], int], int]:
+    """
+    Return a token counter for the configured embedding model and the largest
+    chunk it can encode: tiktoken for OpenAI models, otherwise the tokenizer
+    the encoder already loaded, so chunking needs no second download.
+    """
+    provider = os.getenv("EMBEDDING_PROVIDER", "local").lower()
+    if provider == "openai":
+        encoding = tiktoken.encoding_for_model(getattr(embeddings, "model", "text-embedding-3-small"))
+        return (lambda text: len(encoding.encode(text, disallowed_special=()))), CHUNK_TOKENS
+    
+    if provider == "tei":
+        # The model lives on the server; TEI_MODEL is its Hub id
+        tokenizer = Tokenizer.from_pretrained(os.getenv("TEI_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+        tokenizer.no_truncation()
+        count_tokens = lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        max_length = _tei_max_input_length()
+    elif isinstance(getattr(embeddings, "tokenizer", None), Tokenizer):
+        # LocalOnnxEmbeddings: copy its tokenizer, since the encoder's truncates at max_length
+        tokenizer = Tokenizer.from_str(embeddings.tokenizer.to_str())
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        count_tokens = lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        max_length = embeddings.max_length
+    else:
+        # HuggingFaceEmbeddings: the SentenceTransformer's own fast tokenizer
+        client = embeddings.client
+        hf_tokenizer = client.tokenizer
+        count_tokens = lambda text: len(hf_tokenizer.encode(text, add_special_tokens=False, verbose=False))
+        max_length = client.max_seq_length or 512
+    
+    # sentence-transformers truncates at max_seq_length (256 for MiniLM); leave room for [CLS]/[SEP]
+    return count_tokens, min(CHUNK_TOKENS, max_length - 2)
+
+
+class _PyMuPDFBlockLoader:
+    """
+    Load one Document per page, keeping PyMuPDF's text blocks (paragraphs)
+    separated by blank lines so chunking never has to guess their boundaries.
+    """
+    
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def load(self) -> List[Document]:
+        docs = []
+        with fitz.open(self.file_path) as pdf:
+            for page in pdf:
+                # (x0, y0, x1, y1, text, block_no, block_type); type 0 is text
+                blocks = [block[4].strip() for block in page.get_text("blocks") if block[6] == 0]
+                docs.append(Document(
+                    page_content="\n\n".join(block for block in blocks if block),
+                    metadata={"page": page.number, "total_pages": pdf.page_count}
+                ))
+        return docs
+
+
+def _map_bounded(executor: ProcessPoolExecutor, fn: Callable, paths: List[Path], window: int) -> Iterator[Tuple[Path, Any]]:
+    """
+    Like executor.map, in order, but with at most `window` files submitted ahead of
+    the consumer, so parsed files never pile up faster than they are embedded.
+    """
+    remaining = iter(paths)
+    pending = deque((path, executor.submit(fn, str(path))) for path in itertools.islice(remaining, window))
+    while pending:
+        path, future = pending.popleft()
+        result = future.result()
+        # Keep the workers busy while the consumer handles this result
+        next_path = next(remaining, None)
+        if next_path is not None:
+            pending.append((next_path, executor.submit(fn, str(next_path))))
+        yield path, result
+
+
+def _select_pdf_loader(pdf_file: Path) -> Tuple[Any, Optional[str]]:
+    """
+    Pick a PDF parser for a file: pdfplumber keeps table layout intact, while
+    PyMuPDF is much faster for narrative documents such as CVs.
+    Returns the loader and a warning for the parent process to log, if any.
+    """
+    warning = None
+    try:
+        with fitz.open(pdf_file) as pdf:
+            has_tables = pdf.page_count > 0 and bool(pdf[0].find_tables().tables)
+    except _BAD_FILE_ERRORS as e:
+        warning = f"Could not inspect {pdf_file.name} for tables: {str(e)}"
+        has_tables = False
+    
+    if has_tables:
+        return PDFPlumberLoader(str(pdf_file)), warning
+    return _PyMuPDFBlockLoader(str(pdf_file)), warning
+
+
+def _load_one_pdf(path: str) -> Tuple[List[Document], Optional[str], Optional[str]]:
+    """Parse one PDF in a worker process, returning its pages, the error message and any warning."""
+    pdf_file = Path(path)
+    loader, warning = _select_pdf_loader(pdf_file)
+    try:
+        # One Document per page
+        docs = loader.load()
+    except _BAD_FILE_ERRORS as e:
+        return [], str(e), warning
+    
+    # Add source metadata
+    for doc in docs:
+        doc.metadata.update({
+            "source": str(pdf_file.name),
+            "source_type": "pdf",
+            "file_path": str(pdf_file)
+        })
+    return docs, None, warning
+
+
+def _load_one_text(path: str) -> Tuple[List[Document], Optional[str]]:
+    """Load one text or markdown file in a worker process."""
+    text_file = Path(path)
+    try:
+        docs = TextLoader(str(text_file), encoding='utf-8').load()
+    except _BAD_FILE_ERRORS as e:
+        return [], str(e)
+    
+    # Add source metadata
+    for doc in docs:
+        doc.metadata.update({
+            "source": str(text_file.name),
+            "source_type": "text",
+            "file_path": str(text_file)
+        })
+    return docs, None
+
+
+class _HostRateLimiter:
+    """Token bucket per host, so one host is throttled without serializing the others."""
+    
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.burst = burst
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def acquire(self, host: str):
+        """Wait until a request to `host` is allowed."""
+        async with self._locks[host]:
+            while True:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (float(self.burst), now))
+                tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                await asyncio.sleep((1 - tokens) / self.rate)
+
+
+# Only these subtrees are built when parsing blog pages
+_BLOG_STRAINER = SoupStrainer(["article", "main", "div", "title"])
+_BLOG_CONTENT_SELECTOR = "article, .post-content, .entry-content, .content, main, .post-body"
+
+
+def _parse_blog_html(url: str, html: bytes) -> Optional[Document]:
+    """Extract the main content and title of a blog page."""
+    soup = BeautifulSoup(html, 'lxml', parse_only=_BLOG_STRAINER)
+    
+    # Try to extract the main content
+    # Remove script and style elements
+    for script in soup(["script", "style", "nav", "header", "footer"]):
+        script.decompose()
+    
+    # Try common content selectors in one pass
+    content = None
+    content_elem = soup.select_one(_BLOG_CONTENT_SELECTOR)
+    if content_elem:
+        content = content_elem.get_text(strip=True)
+    
+    if not content and ReadabilityDocument is not None:
+        # Let readability find the main content instead of embedding navigation and footers
+        summary = ReadabilityDocument(html).summary(html_partial=True)
+        content = BeautifulSoup(summary, 'lxml').get_text(strip=True)
+    
+    if not content:
+        # Fallback to everything that was parsed
+        content = soup.get_text(strip=True)
+    
+    if not content:
+        return None
+    
+    # Get title
+    title_elem = soup.find('title')
+    title = title_elem.get_text(strip=True) if title_elem else url
+    
+    return Document(
+        page_content=content,
+        metadata={
+            "source": url,
+            "source_type": "blog",
+            "title": title,
+            "url": url
+        }
+    )
+
+
+_GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Public repositories owned by the user, with README.md contents, in one round trip per 100 repos
+_GITHUB_REPOS_QUERY = """
+query($login: String!, $cursor: String) {
+  user(login: $login) {
+    repositories(first: 100, after: $cursor, privacy: PUBLIC, ownerAffiliations: OWNER) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        url
+        description
+        primaryLanguage { name }
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+        stargazerCount
+        forkCount
+        readme: object(expression: "HEAD:README.md") { ... on Blob { text } }
+      }
+    }
+  }
+}
+"""
+
+
+def _build_http_session() -> requests.Session:
+    """
+    A pooled session so repeated GitHub calls reuse one TLS connection.
+    The adapter only retries connection failures; HTTP statuses are retried
+    by _github_request, which understands GitHub's rate-limit headers.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=64,
+        pool_maxsize=64,
+        max_retries=Retry(total=5, connect=5, read=0, status=0, backoff_factor=0.5)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _HttpCache:
+    """Validators (ETag/Last-Modified), bodies and content hashes of fetched URLs, for conditional GETs."""
+    
+    def __init__(self, path: Path):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, content_hash TEXT)"
+        )
+        # Caches created before content hashes were tracked
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "content_hash" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN content_hash TEXT")
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        """Return (etag, last_modified, body) for `url`, or None if it was never cached."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Headers that let the server answer 304 Not Modified for a cached `url`."""
+        cached = self.get(url)
+        if cached is None:
+            return {}
+        etag, last_modified, _ = cached
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def content_hash(self, url: str) -> Optional[str]:
+        """Hash of the body last seen for `url`, if one was recorded."""
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM responses WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes,
+            content_hash: Optional[str] = None):
+        """Remember a 200 response if it carries a validator or a content hash."""
+        if not etag and not last_modified and not content_hash:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body, content_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, content_hash)
+            )
+
+
+def _source_id(source: str) -> str:
+    """Stable short id of a source (file name, URL, or repository label)."""
+    return hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+def _embedding_model_key(embeddings) -> str:
+    """Identify the encoder, so cached vectors are never reused across models."""
+    model = (
+        getattr(embeddings, "model_name", None)
+        or getattr(embeddings, "model", None)
+        or getattr(embeddings, "model_path", None)
+        or ""
+    )
+    return f"{type(embeddings).__name__}:{model}"
+
+
+class _EmbeddingCache:
+    """
+    On-disk cache of document embeddings keyed by (model, text), stored as float16.
+    Uses the standard library's sqlite3 so it needs no extra service or package.
+    """
+    
+    def __init__(self, path: Path, model_key: str):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB)")
+        self._model_key = model_key
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self._model_key}:{text}".encode(), digest_size=16).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached float32 vectors for `texts`, None where there is no entry."""
+        keys = [self._key(text) for text in texts]
+        found: Dict[bytes, bytes] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+        return [
+            np.frombuffer(found[key], dtype=np.float16).astype(np.float32).tolist() if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Store vectors for `texts` at half precision."""
+        rows = [
+            (self._key(text), np.asarray(vector, dtype=np.float16).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+
+
+def _is_transient_http_error(error: BaseException) -> bool:
+    """Connection failures, timeouts, and 429/503 responses are worth retrying; other errors are not."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in (429, 503)
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+@retry(
+    wait=wait_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(_is_transient_http_error),
+    reraise=True
+)
+async def _fetch_html(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                      limiter: "_HostRateLimiter", url: str,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes, Dict[str, str]]:
+    """
+    Download one page; every attempt waits for its host's rate limit.
+    Returns the status (200, or 304 for a conditional request), body and headers.
+    """
+    await limiter.acquire(urlparse(url).netloc)
+    async with semaphore, session.get(url, headers=headers) as response:
+        response.raise_for_status()
+        return response.status, await response.read(), dict(response.headers)
+
+
+def _github_request(session: requests.Session, method: str, url: str, headers: Dict[str, str],
+                    max_attempts: int = 5, **kwargs) -> requests.Response:
+    """
+    Send a GitHub API request, backing off as directed by the rate-limit headers
+    (Retry-After, or X-RateLimit-Remaining/X-RateLimit-Reset) and retrying
+    transient server errors with exponential backoff.
+    """
+    for attempt in range(max_attempts):
+        response = session.request(method, url, headers=headers, timeout=30, **kwargs)
+        
+        retry_after = response.headers.get("Retry-After")
+        rate_limited = response.status_code in (403, 429) and (
+            retry_after is not None or response.headers.get("X-RateLimit-Remaining") == "0"
+        )
+        if not rate_limited and response.status_code not in (502, 503, 504):
+            return response
+        if attempt == max_attempts - 1:
+            break
+        
+        delay = 2 ** attempt
+        if retry_after is not None:
+            delay = max(delay, float(retry_after))
+        elif rate_limited:
+            delay = max(delay, int(response.headers.get("X-RateLimit-Reset", "0")) - time.time())
+        
+        logger.warning(f"GitHub returned {response.status_code}, retrying in {delay:.0f}s")
+        time.sleep(delay)
+    
+    return response
+
 
 class DataIngestionEngine:
     """
@@ -48,313 +530,630 @@ class DataIngestionEngine:
         self.db_dir = Path("db")
         self.db_dir.mkdir(exist_ok=True)
         
-        # Initialize embeddings based on configuration
-        embedding_provider = os.getenv("EMBEDDING_PROVIDER", "local").lower()
-        
-        if embedding_provider == "openai":
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY is required when using OpenAI embeddings")
-            self.embeddings = OpenAIEmbeddings(openai_api_key=api_key)
-            logger.info("Using OpenAI embeddings")
-        else:
-            # Default to local HuggingFace embeddings
-            model_name = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=model_name,
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
+        # Initialize embeddings with the same configuration the agent queries with,
+        # so stored vectors and query vectors come from the same encoder
+        self.embeddings = ModelConfig.get_embeddings()
+        logger.info(f"Using {os.getenv('EMBEDDING_PROVIDER', 'local')} embeddings: {type(self.embeddings).__name__}")
+        # An embedding server batches across clients, so keep several requests in flight
+        self.embedding_concurrency = (
+            int(os.getenv("TEI_CONCURRENCY", "8"))
+            if os.getenv("EMBEDDING_PROVIDER", "local").lower() == "tei" else 1
+        )
+        # With several GPUs, shard each embedding batch across one encoder process per GPU
+        self.gpu_pool = None
+        self.gpu_count = 1
+        st_model = getattr(self.embeddings, "client", None)
+        if (
+            torch is not None and torch.cuda.device_count() > 1
+            and hasattr(st_model, "start_multi_process_pool")
+            and str(st_model.device).startswith("cuda")
+        ):
+            self.gpu_count = torch.cuda.device_count()
+            self.gpu_pool = st_model.start_multi_process_pool(
+                [f"cuda:{i}" for i in range(self.gpu_count)]
             )
-            logger.info(f"Using local embeddings: {model_name}")
+            logger.info(f"Embedding on {self.gpu_count} GPUs")
+        
+        self.embedding_cache = _EmbeddingCache(
+            self.db_dir / "emb_cache.sqlite", _embedding_model_key(self.embeddings)
+        )
         
-        # Initialize text splitter
+        # Initialize text splitters: structure first, recursive splitting as the fallback
+        self.token_length, self.chunk_tokens = _build_token_counter(self.embeddings)
+        logger.info(f"Chunking at up to {self.chunk_tokens} tokens")
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
+            chunk_size=self.chunk_tokens,
+            chunk_overlap=CHUNK_OVERLAP_TOKENS,
+            length_function=self.token_length,
             separators=["\n\n", "\n", " ", ""]
         )
+        self.markdown_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=[("#", "h1"), ("##", "h2")],
+            strip_headers=False
+        )
+        
+        # Pooled HTTP session and conditional-GET cache for GitHub
+        self.http = _build_http_session()
+        self.http_cache = _HttpCache(self.db_dir / "http_cache.sqlite")
+        # Blog validators and content hashes, saved only once the page's chunks are stored
+        self.pending_http_cache: Dict[str, Tuple[Optional[str], Optional[str], str]] = {}
+        
+        # Embedding and storage have different sweet spots: large batches keep the
+        # encoder busy (every GPU should receive a full batch), while Chroma's insert
+        # throughput peaks around 250 records per add
+        self.embed_batch_size = int(os.getenv("EMBED_BATCH", "512")) * self.gpu_count
+        self.write_batch_size = int(os.getenv("CHROMA_BATCH", "250"))
+        
+        # Chunks buffered between splitting and embedding: a few batches' worth, so
+        # the length sort has something to order while memory stays bounded
+        self.chunk_buffer_size = self.embed_batch_size * 4
+        self.pending_chunks: Dict[str, Document] = {}
+        
+        # Embedded batches waiting for the writer thread, which lives for the whole run
+        self.write_queue: queue.Queue = queue.Queue(maxsize=4)
+        self.writer: Optional[threading.Thread] = None
+        
+        # Chunk ids produced per source in this run, and sources with a chunk that
+        # failed to embed or store; only fully stored sources have stale chunks pruned
+        self.source_chunk_ids: Dict[str, Set[str]] = {}
+        self.failed_sources: Set[str] = set()
+        
+        # One event loop for all async work in a run, so loop-bound state
+        # (locks, pooled connections) stays valid between calls
+        self.loop = asyncio.new_event_loop()
         
         # Initialize ChromaDB
-        self.chroma_client = chromadb.PersistentClient(
-            path=str(self.db_dir),
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
+        self.chroma_client = ModelConfig.get_chroma_client(self.db_dir, allow_reset=True)
         
         # Get or create collection
         self.collection_name = "vitae_knowledge"
-        try:
-            self.collection = self.chroma_client.get_collection(self.collection_name)
-            logger.info(f"Using existing collection: {self.collection_name}")
-        except:
-            self.collection = self.chroma_client.create_collection(
-                name=self.collection_name,
-                metadata={"hnsw:space": "cosine"}
-            )
-            logger.info(f"Created new collection: {self.collection_name}")
+        self.collection = self.chroma_client.get_or_create_collection(
+            name=self.collection_name,
+            metadata=ModelConfig.get_collection_metadata()
+        )
+        logger.info(f"Using collection: {self.collection_name} ({self.collection.count()} chunks)")
+        
+        # Per-source metadata, referenced from chunks by source_id
+        self.sources_collection = ModelConfig.get_sources_collection(self.chroma_client)
+        self.sources: Dict[str, Dict[str, Any]] = ModelConfig.load_sources(self.chroma_client)
+        
+        # Items that could not be loaded, one JSON object per line
+        self.failures_path = self.db_dir / "failures.jsonl"
+
+    def _record_failure(self, kind: str, item: str, error: str):
+        """Append a permanently failed item to failures.jsonl so it can be inspected or retried later."""
+        with open(self.failures_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"time": time.time(), "kind": kind, "item": item, "error": error}) + "\n")
 
-    def load_pdf_documents(self) -> List[Document]:
-        """Load and process PDF documents from the data directory."""
-        documents = []
+    def load_pdf_documents(self) -> Iterator[Document]:
+        """Load and process PDF documents from the data directory, one file at a time."""
         pdf_files = list(self.data_dir.glob("*.pdf"))
         
         logger.info(f"Found {len(pdf_files)} PDF files to process")
+        if not pdf_files:
+            return
         
-        for pdf_file in pdf_files:
-            try:
-                loader = PyPDFLoader(str(pdf_file))
-                docs = loader.load()
-                
-                # Add source metadata
-                for doc in docs:
-                    doc.metadata.update({
-                        "source": str(pdf_file.name),
-                        "source_type": "pdf",
-                        "file_path": str(pdf_file)
-                    })
-                
-                documents.extend(docs)
+        # Parse files in parallel; results are logged and collected here only
+        workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for pdf_file, (docs, error, warning) in _map_bounded(executor, _load_one_pdf, pdf_files, workers * 2):
+                if warning:
+                    logger.warning(warning)
+                if error:
+                    logger.error(f"Error loading PDF {pdf_file}: {error}")
+                    self._record_failure("pdf", str(pdf_file), error)
+                    continue
                 logger.info(f"Loaded {len(docs)} pages from {pdf_file.name}")
-                
-            except Exception as e:
-                logger.error(f"Error loading PDF {pdf_file}: {str(e)}")
-        
-        return documents
+                yield from docs
 
-    def load_text_documents(self) -> List[Document]:
-        """Load and process text documents from the data directory."""
-        documents = []
+    def load_text_documents(self) -> Iterator[Document]:
+        """Load and process text documents from the data directory, one file at a time."""
         text_files = list(self.data_dir.glob("*.txt")) + list(self.data_dir.glob("*.md"))
         
         logger.info(f"Found {len(text_files)} text files to process")
+        if not text_files:
+            return
         
-        for text_file in text_files:
-            try:
-                loader = TextLoader(str(text_file), encoding='utf-8')
-                docs = loader.load()
-                
-                # Add source metadata
-                for doc in docs:
-                    doc.metadata.update({
-                        "source": str(text_file.name),
-                        "source_type": "text",
-                        "file_path": str(text_file)
-                    })
-                
-                documents.extend(docs)
+        workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for text_file, (docs, error) in _map_bounded(executor, _load_one_text, text_files, workers * 2):
+                if error:
+                    logger.error(f"Error loading text file {text_file}: {error}")
+                    self._record_failure("text", str(text_file), error)
+                    continue
                 logger.info(f"Loaded {text_file.name}")
-                
-            except Exception as e:
-                logger.error(f"Error loading text file {text_file}: {str(e)}")
-        
-        return documents
+                yield from docs
 
-    def scrape_blog_urls(self, urls: List[str]) -> List[Document]:
-        """Scrape content from a list of blog URLs."""
-        documents = []
-        
+    def scrape_blog_urls(self, urls: List[str], group_size: int = 32) -> Iterator[Document]:
+        """Scrape content from a list of blog URLs, yielding each group of pages as it completes."""
         logger.info(f"Scraping {len(urls)} blog URLs")
+        # Be respectful with requests: at most one request per second to each host
+        limiter = _HostRateLimiter(rate_per_second=1.0, burst=1)
+        for i in range(0, len(urls), group_size):
+            # All groups share one event loop, which the limiter's locks are bound to
+            yield from self.loop.run_until_complete(self._scrape_all(urls[i:i+group_size], limiter))
+
+    async def _scrape_all(self, urls: List[str], limiter: "_HostRateLimiter") -> List[Document]:
+        """Fetch all blog URLs concurrently, bounded globally and per host."""
+        semaphore = asyncio.Semaphore(10)
+        connector = aiohttp.TCPConnector(limit_per_host=4)
+        timeout = aiohttp.ClientTimeout(total=30)
         
-        for url in urls:
-            try:
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Try to extract the main content
-                # Remove script and style elements
-                for script in soup(["script", "style", "nav", "header", "footer"]):
-                    script.decompose()
-                
-                # Try common content selectors
-                content = None
-                selectors = [
-                    'article', '.post-content', '.entry-content', 
-                    '.content', 'main', '.post-body'
-                ]
-                
-                for selector in selectors:
-                    content_elem = soup.select_one(selector)
-                    if content_elem:
-                        content = content_elem.get_text(strip=True)
-                        break
-                
-                if not content:
-                    # Fallback to body content
-                    content = soup.get_text(strip=True)
-                
-                if content:
-                    # Get title
-                    title_elem = soup.find('title')
-                    title = title_elem.get_text(strip=True) if title_elem else url
-                    
-                    doc = Document(
-                        page_content=content,
-                        metadata={
-                            "source": url,
-                            "source_type": "blog",
-                            "title": title,
-                            "url": url
-                        }
-                    )
-                    documents.append(doc)
-                    logger.info(f"Scraped blog: {title}")
-                
-                # Be respectful with requests
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error scraping URL {url}: {str(e)}")
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*(
+                self._scrape_one(session, semaphore, limiter, url) for url in urls
+            ))
         
-        return documents
+        return [doc for doc in results if doc is not None]
 
-    def fetch_github_repositories(self, username: str) -> List[Document]:
-        """Fetch repository information from GitHub."""
-        documents = []
+    async def _scrape_one(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                          limiter: "_HostRateLimiter", url: str) -> Optional[Document]:
+        """Fetch one blog URL and parse it off the event loop, skipping pages that have not changed."""
+        # Only revalidate pages whose chunks are actually in the collection
+        stored = self._source_is_stored(url)
+        try:
+            status, html, response_headers = await _fetch_html(
+                session, semaphore, limiter, url,
+                self.http_cache.conditional_headers(url) if stored else None
+            )
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Error scraping URL {url}: HTTP {e.status}")
+            self._record_failure("blog", url, f"HTTP {e.status}")
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error scraping URL {url}: {str(e) or type(e).__name__}")
+            self._record_failure("blog", url, str(e) or type(e).__name__)
+            return None
         
+        if status == 304:
+            logger.info(f"Blog not modified: {url}")
+            return None
+        
+        # Servers without validators still resend identical pages
+        content_hash = hashlib.blake2b(html, digest_size=16).hexdigest()
+        if stored and self.http_cache.content_hash(url) == content_hash:
+            logger.info(f"Blog unchanged: {url}")
+            return None
+        
+        # Parsing is CPU work; run it in a thread so other downloads proceed
+        doc = await asyncio.to_thread(_parse_blog_html, url, html)
+        if doc is not None:
+            logger.info(f"Scraped blog: {doc.metadata['title']}")
+            # A cached hash makes the next run skip the page, so it is only committed
+            # after the chunks are written (see _commit_http_cache)
+            self.pending_http_cache[url] = (
+                response_headers.get("ETag"), response_headers.get("Last-Modified"), content_hash
+            )
+        return doc
+
+    def _source_is_stored(self, source: str) -> bool:
+        """Whether the collection holds at least one chunk of `source`."""
+        stored = self.collection.get(where={"source_id": _source_id(source)}, limit=1, include=[])
+        return bool(stored["ids"])
+
+    def fetch_github_repositories(self, username: str) -> Iterator[Document]:
+        """Fetch repository information from GitHub, 100 repositories per GraphQL request."""
         github_token = os.getenv("GITHUB_TOKEN")
         if not github_token:
             logger.warning("No GitHub token provided, skipping repository fetch")
-            return documents
+            return
         
+        repo_count = 0
         try:
             headers = {"Authorization": f"token {github_token}"}
+            cursor = None
             
-            # Fetch user repositories
-            repos_url = f"https://api.github.com/users/{username}/repos"
-            response = requests.get(repos_url, headers=headers)
-            response.raise_for_status()
-            
-            repositories = response.json()
-            logger.info(f"Found {len(repositories)} repositories for {username}")
+            while True:
+                response = _github_request(
+                    self.http, "POST", _GITHUB_GRAPHQL_URL, headers,
+                    json={"query": _GITHUB_REPOS_QUERY, "variables": {"login": username, "cursor": cursor}}
+                )
+                response.raise_for_status()
+                
+                payload = response.json()
+                if payload.get("errors"):
+                    raise RuntimeError(payload["errors"][0].get("message", "GraphQL error"))
+                user = payload["data"]["user"]
+                if user is None:
+                    raise RuntimeError(f"GitHub user {username} not found")
+                
+                repositories = user["repositories"]
+                for repo in repositories["nodes"]:
+                    try:
+                        doc = self._github_repo_document(username, repo, headers)
+                    except (requests.RequestException, KeyError, TypeError, ValueError) as e:
+                        logger.error(f"Error processing repository {repo.get('name', 'unknown')}: {str(e)}")
+                        self._record_failure("github", repo.get('name', 'unknown'), str(e))
+                        continue
+                    repo_count += 1
+                    yield doc
+                
+                if not repositories["pageInfo"]["hasNextPage"]:
+                    break
+                cursor = repositories["pageInfo"]["endCursor"]
             
-            for repo in repositories:
-                try:
-                    # Get repository details
-                    repo_name = repo['name']
-                    repo_url = repo['html_url']
-                    description = repo.get('description', '')
-                    language = repo.get('language', '')
-                    topics = repo.get('topics', [])
-                    
-                    # Fetch README if available
-                    readme_url = f"https://api.github.com/repos/{username}/{repo_name}/readme"
-                    readme_response = requests.get(readme_url, headers=headers)
-                    
-                    readme_content = ""
-                    if readme_response.status_code == 200:
-                        readme_data = readme_response.json()
-                        # Decode base64 content
-                        import base64
-                        readme_content = base64.b64decode(readme_data['content']).decode('utf-8')
-                    
-                    # Create document content
-                    content_parts = [
-                        f"Repository: {repo_name}",
-                        f"URL: {repo_url}",
-                        f"Description: {description}",
-                        f"Primary Language: {language}",
-                        f"Topics: {', '.join(topics)}",
-                        f"Stars: {repo['stargazers_count']}",
-                        f"Forks: {repo['forks_count']}",
-                    ]
-                    
-                    if readme_content:
-                        content_parts.append(f"README:\n{readme_content}")
-                    
-                    doc = Document(
-                        page_content="\n\n".join(content_parts),
-                        metadata={
-                            "source": f"GitHub: {repo_name}",
-                            "source_type": "github",
-                            "repo_name": repo_name,
-                            "repo_url": repo_url,
-                            "language": language,
-                            "topics": topics
-                        }
-                    )
-                    documents.append(doc)
-                    
-                    # Rate limiting
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing repository {repo.get('name', 'unknown')}: {str(e)}")
+            logger.info(f"Found {repo_count} repositories for {username}")
             
-        except Exception as e:
+        except (requests.RequestException, RuntimeError, KeyError, ValueError) as e:
             logger.error(f"Error fetching GitHub repositories: {str(e)}")
+            self._record_failure("github", username, str(e))
+
+    def _github_repo_document(self, username: str, repo: Dict[str, Any], headers: Dict[str, str]) -> Document:
+        """Build the knowledge base document for one repository returned by GraphQL."""
+        repo_name = repo['name']
+        repo_url = repo['url']
+        description = repo.get('description') or ''
+        language = (repo.get('primaryLanguage') or {}).get('name', '')
+        topics = [node['topic']['name'] for node in repo['repositoryTopics']['nodes']]
+        
+        # GraphQL only resolves README.md at HEAD; other README names go through REST
+        readme_content = (repo.get('readme') or {}).get('text') or ""
+        if not readme_content:
+            readme_content = self._fetch_readme_rest(username, repo_name, headers)
+        
+        # Create document content
+        content_parts = [
+            f"Repository: {repo_name}",
+            f"URL: {repo_url}",
+            f"Description: {description}",
+            f"Primary Language: {language}",
+            f"Topics: {', '.join(topics)}",
+            f"Stars: {repo['stargazerCount']}",
+            f"Forks: {repo['forkCount']}",
+        ]
+        
+        if readme_content:
+            content_parts.append(f"README:\n{readme_content}")
+        
+        return Document(
+            page_content="\n\n".join(content_parts),
+            metadata={
+                "source": f"GitHub: {repo_name}",
+                "source_type": "github",
+                "repo_name": repo_name,
+                "repo_url": repo_url,
+                "language": language,
+                "topics": topics
+            }
+        )
+
+    def _fetch_readme_rest(self, username: str, repo_name: str, headers: Dict[str, str]) -> str:
+        """Fetch a repository README through the REST API."""
+        readme_url = f"https://api.github.com/repos/{username}/{repo_name}/readme"
+        # The raw media type returns the file itself instead of a base64 JSON envelope;
+        # unchanged READMEs come back as 304, which skips the download and is not rate limited
+        readme_response = _github_request(
+            self.http, "GET", readme_url,
+            {**headers, "Accept": "application/vnd.github.raw+json", **self.http_cache.conditional_headers(readme_url)}
+        )
+        
+        if readme_response.status_code == 304:
+            body = self.http_cache.get(readme_url)[2]
+        elif readme_response.status_code == 200:
+            body = readme_response.content
+            self.http_cache.put(
+                readme_url,
+                readme_response.headers.get("ETag"),
+                readme_response.headers.get("Last-Modified"),
+                body
+            )
+        else:
+            return ""
         
-        return documents
+        return body.decode('utf-8', errors='replace')
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors and only encoding the misses."""
+        embeddings = self.embedding_cache.get_many(texts)
+        missing = [i for i, vector in enumerate(embeddings) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self._encode(missing_texts)
+            self.embedding_cache.put_many(missing_texts, computed)
+            for i, vector in zip(missing, computed):
+                embeddings[i] = vector
+        return embeddings
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, halving the encoder batch size whenever the GPU runs out of memory."""
+        if self.embedding_concurrency > 1:
+            # The engine's single loop keeps the client's pooled connections valid across batches
+            return self.loop.run_until_complete(self._aencode(texts))
+        if self.gpu_pool is not None:
+            return self._encode_multi_gpu(texts)
+        
+        while True:
+            try:
+                return self.embeddings.embed_documents(texts)
+            except _CUDA_OOM_ERRORS:
+                encode_kwargs = getattr(self.embeddings, "encode_kwargs", None)
+                if not encode_kwargs or encode_kwargs.get("batch_size", 1) <= 1:
+                    raise
+                encode_kwargs["batch_size"] //= 2
+                torch.cuda.empty_cache()
+                logger.warning(f"CUDA out of memory, retrying with batch_size={encode_kwargs['batch_size']}")
+
+    def _encode_multi_gpu(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with one contiguous share per GPU in the encoder process pool."""
+        encode_kwargs = self.embeddings.encode_kwargs
+        vectors = self.embeddings.client.encode_multi_process(
+            texts,
+            self.gpu_pool,
+            batch_size=encode_kwargs.get("batch_size", 256),
+            chunk_size=-(-len(texts) // self.gpu_count),
+            normalize_embeddings=encode_kwargs.get("normalize_embeddings", False)
+        )
+        return vectors.tolist()
+
+    async def _aencode(self, texts: List[str], request_size: int = 32) -> List[List[float]]:
+        """
+        Embed texts as concurrent requests of `request_size` (TEI's default client batch
+        limit), so the server's dynamic batcher can coalesce them.
+        """
+        semaphore = asyncio.Semaphore(self.embedding_concurrency)
+        
+        async def embed_slice(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self.embeddings.aembed_documents(batch)
+        
+        results = await asyncio.gather(*(
+            embed_slice(texts[i:i+request_size]) for i in range(0, len(texts), request_size)
+        ))
+        return [vector for result in results for vector in result]
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """Chunk documents along their structure, depending on the source type."""
+        chunks = []
+        for doc in documents:
+            source_type = doc.metadata.get("source_type")
+            if source_type == "pdf":
+                # PDF pages arrive as blank-line separated layout blocks
+                chunks.extend(self._merge_sections(doc.page_content.split("\n\n"), doc.metadata))
+            elif source_type == "github":
+                chunks.extend(self._merge_sections(_README_HEADING.split(doc.page_content), doc.metadata))
+            elif source_type == "text" and doc.metadata.get("file_path", "").endswith(".md"):
+                sections = [
+                    Document(page_content=section.page_content, metadata={**doc.metadata, **section.metadata})
+                    for section in self.markdown_splitter.split_text(doc.page_content)
+                ]
+                chunks.extend(self.text_splitter.split_documents(sections))
+            else:
+                chunks.extend(self.text_splitter.split_documents([doc]))
+        return chunks
+
+    def _merge_sections(self, sections: List[str], metadata: Dict[str, Any]) -> List[Document]:
+        """
+        Greedily merge consecutive sections up to the chunk size without ever splitting
+        one; only a section that is too large on its own goes to the recursive splitter.
+        """
+        chunks = []
+        current: List[str] = []
+        current_tokens = 0
+        
+        def flush():
+            if current:
+                chunks.append(Document(page_content="\n\n".join(current), metadata=dict(metadata)))
+                current.clear()
+        
+        for section in sections:
+            section = section.strip()
+            if not section:
+                continue
+            tokens = self.token_length(section)
+            if tokens > self.chunk_tokens:
+                flush()
+                current_tokens = 0
+                chunks.extend(self.text_splitter.create_documents([section], metadatas=[dict(metadata)]))
+                continue
+            if current and current_tokens + tokens > self.chunk_tokens:
+                flush()
+                current_tokens = 0
+            current.append(section)
+            current_tokens += tokens
+        
+        flush()
+        return chunks
+
+    def _register_sources(self, chunks: List[Document]) -> List[Document]:
+        """
+        Move source-level metadata into the sources table, leaving each chunk with
+        a source_id and its own fields (page, headings). Changed sources are saved once.
+        """
+        changed = set()
+        slim_chunks = []
+        for chunk in chunks:
+            source_metadata = {key: chunk.metadata[key] for key in _SOURCE_METADATA_KEYS if key in chunk.metadata}
+            metadata = {key: value for key, value in chunk.metadata.items() if key not in _SOURCE_METADATA_KEYS}
+            if source_metadata:
+                source_id = _source_id(str(source_metadata.get("source", "")))
+                if self.sources.get(source_id) != source_metadata:
+                    self.sources[source_id] = source_metadata
+                    changed.add(source_id)
+                metadata["source_id"] = source_id
+            slim_chunks.append(Document(page_content=chunk.page_content, metadata=metadata))
+        
+        if changed:
+            source_ids = sorted(changed)
+            # Written before the chunks that reference them; the placeholder vector is
+            # never searched, the table is only read by id
+            self.sources_collection.upsert(
+                ids=source_ids,
+                documents=[json.dumps(self.sources[source_id], default=str) for source_id in source_ids],
+                embeddings=[[0.0]] * len(source_ids)
+            )
+        return slim_chunks
 
     def process_and_store_documents(self, documents: List[Document]):
-        """Process documents into chunks and store in vector database."""
+        """
+        Split documents into chunks and buffer them; a full buffer is embedded and
+        handed to the writer thread. Call flush_chunks() once the input is exhausted.
+        """
         if not documents:
-            logger.warning("No documents to process")
             return
         
-        logger.info(f"Processing {len(documents)} documents")
-        
         # Split documents into chunks
-        chunks = self.text_splitter.split_documents(documents)
-        logger.info(f"Created {len(chunks)} chunks from documents")
-        
-        # Prepare data for ChromaDB
-        texts = [chunk.page_content for chunk in chunks]
-        metadatas = [chunk.metadata for chunk in chunks]
-        ids = [f"chunk_{i}" for i in range(len(chunks))]
-        
-        # Generate embeddings and store in batches
-        batch_size = 100
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i+batch_size]
-            batch_metadatas = metadatas[i:i+batch_size]
-            batch_ids = ids[i:i+batch_size]
+        chunks = self._register_sources(self.split_documents(documents))
+        
+        # Content-hash ids make re-ingestion idempotent and collapse chunks that
+        # occur more than once in the buffer
+        for chunk in chunks:
+            chunk_id = hashlib.blake2b(chunk.page_content.encode(), digest_size=16).hexdigest()
+            self.pending_chunks[chunk_id] = chunk
+            if "source_id" in chunk.metadata:
+                self.source_chunk_ids.setdefault(chunk.metadata["source_id"], set()).add(chunk_id)
+        
+        if len(self.pending_chunks) >= self.chunk_buffer_size:
+            self.flush_chunks()
+
+    def flush_chunks(self):
+        """Embed the buffered chunks and queue them for the writer thread."""
+        if not self.pending_chunks:
+            return
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_batches, daemon=True)
+            self.writer.start()
+        
+        # Embed in length order so each batch pads to a similar length;
+        # ids and metadatas are permuted with their texts
+        pending = sorted(self.pending_chunks.items(), key=lambda item: len(item[1].page_content))
+        self.pending_chunks = {}
+        ids = [chunk_id for chunk_id, _ in pending]
+        texts = [chunk.page_content for _, chunk in pending]
+        metadatas = [chunk.metadata for _, chunk in pending]
+        logger.info(f"Embedding {len(ids)} buffered chunks")
+        
+        # Embed on this thread while the writer thread stores the previous batches,
+        # so the encoder never waits on Chroma (both release the GIL in C code)
+        embed_batch_size = self.embed_batch_size
+        write_batch_size = self.write_batch_size
+        total_batches = (len(texts) - 1) // embed_batch_size + 1
+        for i in range(0, len(texts), embed_batch_size):
+            batch_number = i // embed_batch_size + 1
+            batch_texts = texts[i:i+embed_batch_size]
+            batch_metadatas = metadatas[i:i+embed_batch_size]
+            batch_ids = ids[i:i+embed_batch_size]
+            
+            # Skip chunks already stored by a previous run, so they are never re-embedded
+            existing = set(self.collection.get(ids=batch_ids, include=[])["ids"])
+            if existing:
+                new_positions = [j for j, chunk_id in enumerate(batch_ids) if chunk_id not in existing]
+                if not new_positions:
+                    logger.info(f"Batch {batch_number}/{total_batches} already stored")
+                    continue
+                batch_texts = [batch_texts[j] for j in new_positions]
+                batch_metadatas = [batch_metadatas[j] for j in new_positions]
+                batch_ids = [batch_ids[j] for j in new_positions]
             
             try:
                 # Generate embeddings
-                embeddings = self.embeddings.embed_documents(batch_texts)
-                
-                # Store in ChromaDB
-                self.collection.add(
+                embeddings = self._embed_batch(batch_texts)
+            except Exception as e:
+                logger.error(f"Error embedding batch {batch_number}/{total_batches}: {str(e)}")
+                self._mark_failed(batch_metadatas)
+                continue
+            
+            logger.info(f"Embedded batch {batch_number}/{total_batches}")
+            for j in range(0, len(batch_texts), write_batch_size):
+                self.write_queue.put((
+                    batch_texts[j:j+write_batch_size],
+                    batch_metadatas[j:j+write_batch_size],
+                    batch_ids[j:j+write_batch_size],
+                    embeddings[j:j+write_batch_size]
+                ))
+
+    def _stop_writer(self):
+        """Send the sentinel and wait for the writer thread to drain the queue."""
+        if self.writer is not None:
+            self.write_queue.put(None)
+            self.writer.join()
+            self.writer = None
+
+    def _write_batches(self):
+        """Writer thread: store embedded batches in ChromaDB until the sentinel arrives."""
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                return
+            batch_texts, batch_metadatas, batch_ids, embeddings = item
+            
+            try:
+                self.collection.upsert(
                     documents=batch_texts,
                     metadatas=batch_metadatas,
                     ids=batch_ids,
                     embeddings=embeddings
                 )
-                
-                logger.info(f"Stored batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1}")
-                
+                logger.info(f"Stored {len(batch_ids)} chunks")
             except Exception as e:
-                logger.error(f"Error storing batch {i//batch_size + 1}: {str(e)}")
+                logger.error(f"Error storing {len(batch_ids)} chunks: {str(e)}")
+                self._mark_failed(batch_metadatas)
+
+    def _mark_failed(self, metadatas: List[Dict[str, Any]]):
+        """Record the sources of chunks that were not stored."""
+        self.failed_sources.update(metadata["source_id"] for metadata in metadatas if "source_id" in metadata)
+
+    def _prune_stale_chunks(self):
+        """
+        Delete chunks left over from earlier versions of the sources stored in this run.
+        Sources with a failed chunk keep their old chunks until a run stores them fully.
+        """
+        # Identical text in two sources shares one id, so a chunk still produced
+        # by any source is never stale
+        current_ids = set().union(*self.source_chunk_ids.values())
+        deleted = 0
+        for source_id in self.source_chunk_ids:
+            if source_id in self.failed_sources:
+                continue
+            stored_ids = self.collection.get(where={"source_id": source_id}, include=[])["ids"]
+            stale = [chunk_id for chunk_id in stored_ids if chunk_id not in current_ids]
+            if stale:
+                self.collection.delete(ids=stale)
+                deleted += len(stale)
+        if deleted:
+            logger.info(f"Deleted {deleted} stale chunks")
+
+    def _commit_http_cache(self):
+        """Save the validators of blog pages whose chunks were all stored."""
+        for url, (etag, last_modified, content_hash) in self.pending_http_cache.items():
+            if _source_id(url) not in self.failed_sources:
+                self.http_cache.put(url, etag, last_modified, b"", content_hash)
+        self.pending_http_cache = {}
 
     def run_ingestion(self):
         """Main ingestion pipeline."""
         logger.info("Starting VitaeAgent data ingestion...")
         
-        all_documents = []
-        
         # Load documents from files
-        all_documents.extend(self.load_pdf_documents())
-        all_documents.extend(self.load_text_documents())
+        sources = [self.load_pdf_documents(), self.load_text_documents()]
         
         # Load from external sources
         blog_urls_file = self.data_dir / "blog_urls.txt"
         if blog_urls_file.exists():
             with open(blog_urls_file, 'r') as f:
                 blog_urls = [line.strip() for line in f if line.strip()]
-            all_documents.extend(self.scrape_blog_urls(blog_urls))
+            sources.append(self.scrape_blog_urls(blog_urls))
         
         # Fetch GitHub repositories
         github_username = os.getenv("GITHUB_USERNAME")
         if github_username:
-            all_documents.extend(self.fetch_github_repositories(github_username))
+            sources.append(self.fetch_github_repositories(github_username))
+        
+        # Split documents as they stream in and embed whenever the chunk buffer
+        # fills, so memory is bounded by the buffer rather than by the whole corpus
+        try:
+            for doc in itertools.chain.from_iterable(sources):
+                self.process_and_store_documents([doc])
+            self.flush_chunks()
+        finally:
+            # Sentinel: let the writer drain the queue and exit
+            self._stop_writer()
+        self._prune_stale_chunks()
+        self._commit_http_cache()
         
-        # Process and store all documents
-        self.process_and_store_documents(all_documents)
+        if self.gpu_pool is not None:
+            self.embeddings.client.stop_multi_process_pool(self.gpu_pool)
+            self.gpu_pool = None
+        self.loop.close()
         
         # Print summary
         collection_count = self.collection.count()